@@ -253,10 +253,16 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'shop': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': True,
+        },
         'shop.admin': {
             'handlers': ['file', 'console'],
             'level': 'INFO',
-            'propagate': True,
+            # Already handled here; don't repeat on the 'shop' console handler
+            'propagate': False,
         },
         'ai_chatbot_agent': {
             'handlers': ['file', 'console'],
@@ -1,13 +1,11 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
 from django.urls import reverse, path
-from django.utils.safestring import mark_safe
 from django.contrib.admin import AdminSite
-from django.template.response import TemplateResponse
-from django.db.models import Sum, Count, Avg, Q
+from django.db.models import Sum, Count, Avg
 from django.utils import timezone
-from datetime import timedelta, datetime
+from datetime import timedelta
 from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.models import User
 from django.shortcuts import render
@@ -20,6 +18,8 @@ from .models import (
     UserNotification, ProductReview, EnvironmentalImpact
 )
 
+from .tasks import send_confirmation_task
+
 # Set up logging
 logger = logging.getLogger('shop.admin')
 
@@ -175,7 +175,7 @@ class EcoCommerceAdminSite(AdminSite):
         writer = csv.writer(response)
         writer.writerow(['Order ID', 'User', 'Date', 'Status', 'Total', 'Carbon Impact'])
         
-        orders = Order.objects.select_related('user').order_by('-created')
+        orders = Order.objects.select_related('user', 'impact').with_totals().order_by('-created')
         for order in orders:
             carbon_impact = 'N/A'
             if hasattr(order, 'impact'):
@@ -376,6 +376,11 @@ class OrderAdmin(admin.ModelAdmin):
     inlines = [OrderItemInline]
     actions = ['mark_processing', 'mark_shipped', 'mark_delivered', 'send_confirmation_email']
     date_hierarchy = 'created'
+    # Customer link, carbon badge and total come from the row itself instead of per-order queries
+    list_select_related = ('user', 'impact')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_totals()
     
     fieldsets = (
         ('📋 Order Information', {
@@ -469,6 +474,25 @@ class OrderAdmin(admin.ModelAdmin):
         logger.info(f"{request.user.username} marked {updated} orders as delivered")
     mark_delivered.short_description = "✅ Mark as Delivered"
 
+    def send_confirmation_email(self, request, queryset):
+        # Sent in the request (there is no task queue) so the admin sees what actually went out
+        sent = failed = 0
+        for order_id in queryset.values_list('id', flat=True):
+            if send_confirmation_task(order_id):
+                sent += 1
+            else:
+                failed += 1
+        if sent:
+            self.message_user(request, f'Confirmation emails sent for {sent} orders.')
+        if failed:
+            self.message_user(
+                request,
+                f'Confirmation emails failed for {failed} orders; see the shop log for details.',
+                messages.WARNING if sent else messages.ERROR,
+            )
+        logger.info(f"{request.user.username} sent confirmation emails for {sent} orders ({failed} failed)")
+    send_confirmation_email.short_description = "📧 Send Confirmation Email"
+
 # Enhanced Rating Admin
 @admin.register(Rating, site=admin_site)
 class RatingAdmin(admin.ModelAdmin):
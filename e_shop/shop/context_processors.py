@@ -1,10 +1,7 @@
-from .models import Cart
+from .models import CartItem
 
 def cart_items_count(request):
     if request.user.is_authenticated:
-        try:
-            cart = Cart.objects.get(user=request.user)
-            return {'cart_items_count': cart.items.count()}
-        except Cart.DoesNotExist:
-            return {'cart_items_count': 0}
+        # Counting through the cart join is one query and needs no Cart.DoesNotExist branch
+        return {'cart_items_count': CartItem.objects.filter(cart__user=request.user).count()}
     return {'cart_items_count': 0}
\ No newline at end of file
@@ -3,7 +3,6 @@ Management command to send daily stock alert notifications
 Usage: python manage.py send_stock_alerts
 """
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 from shop.models import Product, StockAlert
 from shop.services.notifications import create_stock_alert_notification
 
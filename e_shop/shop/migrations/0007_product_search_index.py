@@ -0,0 +1,33 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+INDEX_NAME = 'shop_product_search_gin'
+
+
+def search_index():
+    return GinIndex(SearchVector('name', 'description', config='english'), name=INDEX_NAME)
+
+
+def add_search_index(apps, schema_editor):
+    # Full-text GIN index is PostgreSQL-only; other backends keep the ILIKE fallback
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.add_index(apps.get_model('shop', 'Product'), search_index())
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('shop', 'Product'), search_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0006_environmentalimpact_badge_category_badge_icon_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
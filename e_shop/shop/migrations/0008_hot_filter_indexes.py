@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations, models
+
+TRIGRAM_INDEX_NAME = 'shop_product_name_trgm'
+
+
+def trigram_index():
+    return GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name=TRIGRAM_INDEX_NAME)
+
+
+def add_trigram_index(apps, schema_editor):
+    # Speeds up name__icontains lookups; pg_trgm only exists on PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.add_index(apps.get_model('shop', 'Product'), trigram_index())
+
+
+def remove_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('shop', 'Product'), trigram_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0007_product_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'paid', 'status'], name='shop_order_user_id_f2902b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['order', 'product'], name='shop_orderi_order_i_d3fcce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['available', 'category'], name='shop_produc_availab_16d7dc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price'], name='shop_produc_price_3b79b5_idx'),
+        ),
+        migrations.RunPython(add_trigram_index, remove_trigram_index),
+    ]
@@ -0,0 +1,55 @@
+import django.contrib.postgres.search
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+INDEX_NAME = 'shop_product_search_vector_gin'
+# Functional index from 0007, superseded by the stored column
+EXPRESSION_INDEX_NAME = 'shop_product_search_gin'
+SEARCH_CONFIG = 'english'
+
+
+def vector_index():
+    return GinIndex(fields=['search_vector'], name=INDEX_NAME)
+
+
+def expression_index():
+    return GinIndex(SearchVector('name', 'description', config=SEARCH_CONFIG), name=EXPRESSION_INDEX_NAME)
+
+
+def add_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('shop', 'Product')
+    schema_editor.remove_index(Product, expression_index())
+    schema_editor.add_index(Product, vector_index())
+    Product.objects.update(
+        search_vector=(
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        )
+    )
+
+
+def remove_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('shop', 'Product')
+    schema_editor.remove_index(Product, vector_index())
+    schema_editor.add_index(Product, expression_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(add_vector_index, remove_vector_index),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+def mark_existing_orders(apps, schema_editor):
+    # Orders placed so far already had their stock taken at checkout
+    apps.get_model('shop', 'Order').objects.update(stock_adjusted=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='stock_adjusted',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_existing_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations
+
+# (model, field, index name); Product.name is already covered by 0008
+TRIGRAM_INDEXES = [
+    ('Product', 'description', 'shop_product_desc_trgm'),
+    ('Category', 'name', 'shop_category_name_trgm'),
+]
+
+
+def trigram_index(field, name):
+    return GinIndex(fields=[field], opclasses=['gin_trgm_ops'], name=name)
+
+
+def add_trigram_indexes(apps, schema_editor):
+    # Serve fuzzy_search_products' trigram operators (description %> query, Category.name % query)
+    # and icontains lookups on these columns (admin search, search_products' category match).
+    # pg_trgm only exists on PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for model_name, field, name in TRIGRAM_INDEXES:
+        schema_editor.add_index(apps.get_model('shop', model_name), trigram_index(field, name))
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, field, name in TRIGRAM_INDEXES:
+        schema_editor.remove_index(apps.get_model('shop', model_name), trigram_index(field, name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_order_stock_adjusted'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_trigram_indexes, remove_trigram_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0012_notification_read_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['available', '-created'], name='shop_produc_availab_1f1917_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(fields=['product', '-created_at'], name='shop_produc_product_705e6f_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_stats(apps, schema_editor):
+    # Mirrors ProductQuerySet.refresh_rating_stats(), which historical models don't carry
+    Product = apps.get_model('shop', 'Product')
+
+    def per_product(model_name, aggregate):
+        return Subquery(
+            apps.get_model('shop', model_name).objects.filter(product=OuterRef('pk'))
+            .order_by().values('product')
+            .annotate(value=aggregate).values('value')
+        )
+
+    Product.objects.update(
+        avg_rating=Coalesce(
+            per_product('ProductReview', Avg('rating')),
+            per_product('Rating', Avg('rating')),
+            Value(0.0),
+            output_field=models.FloatField(),
+        ),
+        review_count=Coalesce(per_product('ProductReview', Count('id')), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0013_listing_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='avg_rating',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', '-avg_rating'], name='shop_produc_categor_874904_idx'),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
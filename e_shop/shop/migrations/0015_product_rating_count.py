@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_count(apps, schema_editor):
+    # Mirrors ProductQuerySet.refresh_rating_stats(), which historical models don't carry
+    Product = apps.get_model('shop', 'Product')
+
+    def per_product(model_name):
+        return Subquery(
+            apps.get_model('shop', model_name).objects.filter(product=OuterRef('pk'))
+            .order_by().values('product')
+            .annotate(value=Count('id')).values('value')
+        )
+
+    Product.objects.update(
+        rating_count=Coalesce(per_product('ProductReview'), per_product('Rating'), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0014_product_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_count, migrations.RunPython.noop),
+    ]
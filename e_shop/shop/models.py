@@ -2,6 +2,9 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import Avg, Count, Exists, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from decimal import Decimal
 
 
@@ -28,6 +31,48 @@ class Category(models.Model):
         return self.name
 
 
+class ProductQuerySet(models.QuerySet):
+    def with_effective_carbon(self):
+        """Annotate effective_carbon (product value or category fallback) in SQL"""
+        return self.annotate(effective_carbon=Coalesce(
+            'carbon_footprint_kg',
+            'category__default_emission_factor_kg',
+            Value(Decimal("0.00")),
+            output_field=models.DecimalField(max_digits=8, decimal_places=2),
+        ))
+
+    def refresh_rating_stats(self):
+        """Recompute the denormalized rating columns in one UPDATE.
+        avg_rating is the review average, falling back to the older star ratings;
+        rating_count is the number of ratings that average was taken over"""
+        def per_product(model, aggregate):
+            return Subquery(
+                model.objects.filter(product=OuterRef('pk'))
+                .order_by().values('product')
+                .annotate(value=aggregate).values('value')
+            )
+        return self.update(
+            avg_rating=Coalesce(
+                per_product(ProductReview, Avg('rating')),
+                per_product(Rating, Avg('rating')),
+                Value(0.0),
+                output_field=models.FloatField(),
+            ),
+            review_count=Coalesce(per_product(ProductReview, Count('id')), Value(0)),
+            rating_count=Coalesce(
+                per_product(ProductReview, Count('id')),
+                per_product(Rating, Count('id')),
+                Value(0),
+            ),
+        )
+
+    def with_purchased_by(self, user):
+        """Annotate user_has_purchased (paid order containing the product) as an EXISTS subquery"""
+        return self.annotate(user_has_purchased=Exists(
+            OrderItem.objects.filter(order__user=user, order__paid=True, product=OuterRef('pk'))
+        ))
+
+
 # Products in the e-sho
 class Product(models.Model):
     name = models.CharField(max_length=200)
@@ -50,7 +95,25 @@ class Product(models.Model):
     )
     ethics_score = models.PositiveIntegerField(default=50, help_text="0-100 composite ethics score")
     impact_confidence = models.PositiveIntegerField(default=80, help_text="Confidence in impact data (0-100)")
+    # Precomputed full-text document (PostgreSQL only), kept in sync by shop.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Denormalized rating stats, kept in sync by shop.signals (see refresh_rating_stats)
+    avg_rating = models.FloatField(default=0, editable=False)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Listing filters: available products per category and price ranges
+            models.Index(fields=['available', 'category']),
+            models.Index(fields=['price']),
+            # Default "newest first" listing order
+            models.Index(fields=['available', '-created']),
+            # Best rated products in a category (related products)
+            models.Index(fields=['category', '-avg_rating']),
+        ]
 
     def __str__(self):
         return self.name
@@ -61,20 +124,12 @@ class Product(models.Model):
         return reverse('shop:product_detail', kwargs={'slug': self.slug})
     
     def average_rating(self):
-        """Calculate average rating from reviews"""
-        reviews = self.reviews.all()
-        if reviews.count() > 0:
-            return sum([review.rating for review in reviews]) / reviews.count()
-        
-        # Fallback to old ratings system if no reviews
-        ratings = self.ratings.all()
-        if ratings.count() > 0:
-            return sum([rating.rating for rating in ratings]) / ratings.count()
-        return 0
+        """Average review rating, falling back to the old ratings system if no reviews"""
+        return self.avg_rating
     
     def get_review_count(self):
         """Get total number of reviews"""
-        return self.reviews.count()
+        return self.review_count
     
     def is_in_stock(self):
         """Check if product is in stock"""
@@ -86,6 +141,10 @@ class Product(models.Model):
     
     # Sustainability helper: effective carbon (product value or category fallback)
     def effective_carbon_kg(self):
+        # Prefer the with_effective_carbon() annotation to avoid a category lookup
+        annotated = self.__dict__.get('effective_carbon')
+        if annotated is not None:
+            return annotated
         if self.carbon_footprint_kg is not None:
             return self.carbon_footprint_kg
         if self.category and self.category.default_emission_factor_kg:
@@ -149,6 +208,18 @@ class CartItem(models.Model):
         return self.product.price * self.quantity
    
 
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate item_count and total_cost so listings don't walk each order's items"""
+        return self.annotate(
+            item_count=Count('items'),
+            total_cost=Sum(
+                models.F('items__price') * models.F('items__quantity'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+
+
 class Order(models.Model):
     STATUS_CHOICES = (
         ('Pending', 'Pending'),
@@ -172,6 +243,8 @@ class Order(models.Model):
     note = models.TextField(blank=True)
     paid = models.BooleanField(default=False)
     transaction_id = models.CharField(max_length=100, blank=True, null=True)
+    # Set once the ordered quantities have been taken out of product stock
+    stock_adjusted = models.BooleanField(default=False, editable=False)
     
     # Enhanced tracking fields
     tracking_number = models.CharField(max_length=100, blank=True, null=True)
@@ -180,15 +253,68 @@ class Order(models.Model):
     delivered_at = models.DateTimeField(null=True, blank=True)
     courier_service = models.CharField(max_length=100, blank=True, help_text="e.g., DHL, FedEx, UPS")
 
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['user', 'paid', 'status']),
+        ]
 
     def __str__(self):
         return f"Order {self.id}"
     
     def get_total_cost(self):
+        # Prefer the with_totals() annotation over walking the items
+        if 'total_cost' in self.__dict__:
+            return self.total_cost or 0
         return sum(item.get_cost() for item in self.items.all())
+
+    def get_status_timeline(self):
+        """Completed tracking steps, oldest first, for the order detail page"""
+        timeline = []
+        if self.created:
+            timeline.append({
+                'status': 'Order Placed',
+                'date': self.created,
+                'completed': True
+            })
+
+        if self.paid:
+            timeline.append({
+                'status': 'Payment Confirmed',
+                'date': self.updated,  # Approximate
+                'completed': True
+            })
+
+        if self.status in ['Processing', 'Shipped', 'Out for Delivery', 'Delivered']:
+            timeline.append({
+                'status': 'Processing',
+                'date': self.updated,
+                'completed': True
+            })
+
+        if self.shipped_at:
+            timeline.append({
+                'status': 'Shipped',
+                'date': self.shipped_at,
+                'completed': True
+            })
+
+        if self.status == 'Out for Delivery':
+            timeline.append({
+                'status': 'Out for Delivery',
+                'date': self.updated,
+                'completed': True
+            })
+
+        if self.delivered_at:
+            timeline.append({
+                'status': 'Delivered',
+                'date': self.delivered_at,
+                'completed': True
+            })
+        return timeline
         
     def get_status_display_class(self):
         """Return CSS class for status display"""
@@ -211,6 +337,11 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['order', 'product']),
+        ]
+
     def __str__(self):
         return f"{self.quantity} X {self.product.name}"
 
@@ -343,6 +474,9 @@ class UserNotification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
@@ -362,6 +496,10 @@ class ProductReview(models.Model):
     class Meta:
         unique_together = ('product', 'user')
         ordering = ['-created_at']
+        indexes = [
+            # A product's reviews, newest first
+            models.Index(fields=['product', '-created_at']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name} ({self.rating}★)"
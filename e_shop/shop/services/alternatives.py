@@ -1,18 +1,53 @@
+from django.db.models import OuterRef, Subquery
 from shop.models import Product
 
 
-def greener_alternative(product: Product):
+# Lowest effective footprint first (the category factor stands in for a missing value),
+# matching the DB ordering below
+def _carbon_order_key(p: Product):
+    return (p.effective_carbon_kg(), p.id)
+
+
+def greener_alternative(product: Product, candidates=None):
+    """Lowest-carbon sibling in the product's category.
+
+    ``candidates`` may be an already-loaded list of category products to avoid a query.
+    """
+    if candidates is not None:
+        others = [p for p in candidates if p.available and p.id != product.id]
+        return min(others, key=_carbon_order_key, default=None)
     return (
         Product.objects.filter(category=product.category, available=True)
+        .with_effective_carbon()
         .exclude(id=product.id)
-        .order_by('carbon_footprint_kg', 'id')
+        .order_by('effective_carbon', 'id')
         .first()
     )
 
 
-def swap_ladder(product: Product):
-    qs = Product.objects.filter(category=product.category, available=True).order_by('carbon_footprint_kg', 'id')
-    items = list(qs)
+def greener_alternative_id(product_ref='pk', category_ref='category_id'):
+    """greener_alternative() as a subquery yielding the alternative's id, for annotating
+    many rows at once; the refs name the outer product id and category id columns"""
+    return Subquery(
+        Product.objects.filter(category_id=OuterRef(category_ref), available=True)
+        .with_effective_carbon()
+        .exclude(id=OuterRef(product_ref))
+        .order_by('effective_carbon', 'id')
+        .values('id')[:1]
+    )
+
+
+def swap_ladder(product: Product, candidates=None):
+    if candidates is not None:
+        others = [p for p in candidates if p.available and p.id != product.id]
+        items = sorted(others + ([product] if product.available else []), key=_carbon_order_key)
+    else:
+        qs = (
+            Product.objects.filter(category=product.category, available=True)
+            .with_effective_carbon()
+            .order_by('effective_carbon', 'id')
+        )
+        items = list(qs)
     current = product
     better = None
     best = items[0] if items else None
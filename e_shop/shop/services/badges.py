@@ -1,6 +1,5 @@
 from decimal import Decimal
 from shop.models import Badge, UserBadge, UserImpact
-from django.contrib.auth import get_user_model
 
 # Predefined badge definitions (idempotent creation function)
 BADGE_DEFS = [
@@ -2,18 +2,29 @@
 Carbon intelligence service for smart environmental insights and gamification
 """
 from decimal import Decimal
+from django.core.cache import cache
 from django.db.models import Avg
-from ..models import Product, EnvironmentalImpact, Badge, UserImpact, UserBadge
+from ..models import Product, Badge, UserImpact, UserBadge
 
 
-def analyze_product_carbon_impact(product):
+def analyze_product_carbon_impact(product, candidates=None):
     """Analyze if product qualifies for low-carbon badge popup"""
     
     # Get category average carbon footprint
-    category_avg = Product.objects.filter(
-        category=product.category,
-        carbon_footprint_kg__isnull=False
-    ).aggregate(avg_carbon=Avg('carbon_footprint_kg'))['avg_carbon'] or Decimal('0')
+    if candidates is not None:
+        # Pre-loaded category siblings, available or not, plus the product itself: the
+        # same population as the query below
+        values = [
+            p.carbon_footprint_kg
+            for p in [product, *(c for c in candidates if c.id != product.id)]
+            if p.carbon_footprint_kg is not None
+        ]
+        category_avg = (sum(values) / len(values)) if values else Decimal('0')
+    else:
+        category_avg = Product.objects.filter(
+            category=product.category,
+            carbon_footprint_kg__isnull=False
+        ).aggregate(avg_carbon=Avg('carbon_footprint_kg'))['avg_carbon'] or Decimal('0')
     
     product_carbon = product.effective_carbon_kg()
     
@@ -115,6 +126,20 @@ def get_environmental_equivalents(carbon_saved_kg):
     return equivalents
 
 
+IMPACT_STORY_CACHE_TIMEOUT = 3600  # seconds
+
+
+def impact_story_cache_key(user_id):
+    return f'impact_story:{user_id}'
+
+
+def cached_impact_story(user):
+    """generate_impact_story() served from cache; shop.signals drops it when UserImpact changes"""
+    return cache.get_or_set(
+        impact_story_cache_key(user.id), lambda: generate_impact_story(user), IMPACT_STORY_CACHE_TIMEOUT
+    )
+
+
 def generate_impact_story(user):
     """Generate personalized environmental impact story"""
     try:
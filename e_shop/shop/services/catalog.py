@@ -0,0 +1,92 @@
+from django.contrib.postgres.lookups import TrigramSimilar, TrigramWordSimilar
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity, TrigramWordSimilarity,
+)
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from shop.models import Category, Product
+
+
+CATEGORIES_CACHE_KEY = 'shop:cat_list'
+CATEGORIES_CACHE_TIMEOUT = 3600  # seconds; shop.signals invalidates on change
+FEATURED_PRODUCTS_CACHE_KEY = 'shop:featured8'
+FEATURED_PRODUCTS_CACHE_TIMEOUT = 600  # seconds
+
+# Text search configuration for the stored Product.search_vector column (GIN indexed in 0009)
+SEARCH_CONFIG = 'english'
+
+
+def all_categories():
+    """Category dicts (id, name, slug, product_count) for navigation, served from cache"""
+    return cache.get_or_set(
+        CATEGORIES_CACHE_KEY,
+        lambda: list(
+            Category.objects.order_by('name')
+            .values('id', 'name', 'slug')
+            .annotate(product_count=Count('products'))
+        ),
+        CATEGORIES_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_categories():
+    cache.delete(CATEGORIES_CACHE_KEY)
+
+
+def invalidate_featured_products():
+    cache.delete(FEATURED_PRODUCTS_CACHE_KEY)
+
+
+def product_search_vector():
+    """Weighted document for Product.search_vector: name matches rank above description"""
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vector(product_ids):
+    if connection.vendor != 'postgresql':
+        return
+    Product.objects.filter(pk__in=product_ids).update(search_vector=product_search_vector())
+
+
+def search_products(products, query):
+    """Filter products by a free-text query, ranked full-text search on PostgreSQL"""
+    category_match = Q(category_id__in=Category.objects.filter(name__icontains=query).values('id'))
+    if connection.vendor != 'postgresql':
+        return products.filter(Q(name__icontains=query) | Q(description__icontains=query) | category_match)
+
+    search = SearchQuery(query, config=SEARCH_CONFIG)
+    return (
+        products.annotate(rank=SearchRank(F('search_vector'), search))
+        .filter(Q(search_vector=search) | category_match)
+        .order_by('-rank')
+    )
+
+
+def fuzzy_search_products(products, query):
+    """Typo-tolerant, relevance-ordered match on name/description/category (pg_trgm on PostgreSQL)"""
+    if connection.vendor != 'postgresql':
+        return products.filter(
+            Q(name__icontains=query) | Q(description__icontains=query) | Q(category__name__icontains=query)
+        )
+
+    # Filter with the pg_trgm operators (% and %>) so the gin_trgm_ops indexes (0008, 0011) pick the
+    # rows and only those are scored; pg_trgm.similarity_threshold / word_similarity_threshold set
+    # the cut-offs. Word similarity for description: the query only has to match part of a long text.
+    # Categories are resolved up front (small table) so every branch of the OR is indexable
+    matches = Q(TrigramSimilar(F('name'), query)) | Q(TrigramWordSimilar(F('description'), query))
+    category_ids = list(
+        Category.objects.filter(TrigramSimilar(F('name'), query)).values_list('id', flat=True)
+    )
+    if category_ids:
+        matches |= Q(category_id__in=category_ids)
+    similarity = Greatest(
+        TrigramSimilarity('name', query),
+        TrigramWordSimilarity(query, 'description'),
+        TrigramSimilarity('category__name', query),
+    )
+    return products.filter(matches).annotate(similarity=similarity).order_by('-similarity')
@@ -1,8 +1,7 @@
 """
 Notification service for handling user notifications
 """
-from django.contrib.auth.models import User
-from ..models import UserNotification, StockAlert, Product
+from ..models import UserNotification, StockAlert
 
 
 def create_notification(user, title, message, notification_type, related_product=None, related_order=None):
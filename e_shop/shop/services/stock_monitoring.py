@@ -4,7 +4,7 @@ Stock monitoring and inventory management service
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from ..models import Product, StockAlert
-from .notifications import create_stock_alert_notification, create_notification
+from .notifications import create_notification
 
 
 def check_low_stock_alerts(product):
@@ -90,7 +90,7 @@ def update_product_availability():
 
 def get_stock_report():
     """Generate a comprehensive stock report"""
-    from django.db.models import Count, Sum, F
+    from django.db.models import Sum, F
     
     total_products = Product.objects.count()
     in_stock = Product.objects.filter(stock__gt=0).count()
@@ -1,14 +1,44 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from shop.models import Order
-from shop.services.impact import record_order_impact
-
-
-@receiver(post_save, sender=Order)
-def order_post_save(sender, instance, created, **kwargs):
-    if created:
-        try:
-            record_order_impact(instance)
-        except Exception:
-            # In production add logging
-            pass
+from django.core.cache import cache
+from shop.models import Category, Product, UserImpact, ProductReview, Rating
+from shop.services.catalog import invalidate_categories, invalidate_featured_products, refresh_search_vector
+from shop.services.carbon_intelligence import impact_story_cache_key
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    invalidate_categories()
+    # Featured cards carry the category emission factor
+    invalidate_featured_products()
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    refresh_search_vector([instance.pk])
+    invalidate_featured_products()
+    # Cached category list carries product counts
+    invalidate_categories()
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    invalidate_featured_products()
+    invalidate_categories()
+
+
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=ProductReview)
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def product_rated(sender, instance, **kwargs):
+    Product.objects.filter(pk=instance.product_id).refresh_rating_stats()
+    # Featured cards carry their average rating
+    invalidate_featured_products()
+
+
+@receiver(post_save, sender=UserImpact)
+@receiver(post_delete, sender=UserImpact)
+def user_impact_changed(sender, instance, **kwargs):
+    cache.delete(impact_story_cache_key(instance.user_id))
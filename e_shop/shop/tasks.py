@@ -0,0 +1,43 @@
+"""
+Order side effects (confirmation email, impact recording) run once the order is committed
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import Order, OrderItem
+from .services.impact import record_order_impact
+from .utils import send_order_confirmation_email
+
+logger = logging.getLogger(__name__)
+
+
+def _run(task, *args):
+    try:
+        task(*args)
+    except Exception:
+        logger.exception("task.failed task=%s args=%s", task.__name__, args)
+
+
+def run_after_commit(task, *args):
+    """Run task(*args) in this process once the current transaction commits (right
+    away outside one). Failures are logged rather than failing the caller"""
+    transaction.on_commit(lambda: _run(task, *args))
+
+
+def send_confirmation_task(order_id):
+    # The email lists every line with its product name
+    order = Order.objects.prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+    ).get(id=order_id)
+    extra = {'order_id': order_id, 'email': order.email}
+    if send_order_confirmation_email(order):
+        logger.info("order.confirmation_sent order_id=%s", order_id, extra=extra)
+        return True
+    logger.warning("order.confirmation_failed order_id=%s", order_id, extra=extra)
+    return False
+
+
+def record_order_impact_task(order_id):
+    record_order_impact(Order.objects.get(id=order_id))
@@ -1,3 +1,261 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from .models import Cart, CartItem, Category, Order, OrderItem, Product, ProductReview, Rating
+
+
+class ShopTestCase(TestCase):
+    def setUp(self):
+        # Catalog data is cached across requests; start every test cold
+        cache.clear()
+        self.user = User.objects.create_user('shopper', 'shopper@example.com', 'pw')
+        self.category = Category.objects.create(name='Kitchen', slug='kitchen')
+
+    def make_product(self, name, **fields):
+        fields.setdefault('price', Decimal('10.00'))
+        fields.setdefault('stock', 10)
+        return Product.objects.create(name=name, slug=name.lower(), category=self.category, **fields)
+
+    def make_order(self, lines, **fields):
+        order = Order.objects.create(
+            user=self.user, first_name='Sam', last_name='Shopper', email='shopper@example.com',
+            address='1 Road', postal_code='1000', city='Dhaka', **fields,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, price=product.price, quantity=quantity)
+            for product, quantity in lines
+        ])
+        return order
+
+
+class PaymentSuccessStockTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.kettle = self.make_product('Kettle', stock=5)
+        self.toaster = self.make_product('Toaster', stock=1)
+
+    def pay(self, order):
+        return self.client.get(reverse('shop:payment_success', args=[order.id]))
+
+    def test_decrements_stock_once_and_clamps_at_zero(self):
+        order = self.make_order([(self.kettle, 2), (self.toaster, 3)])
+
+        response = self.pay(order)
+
+        self.assertRedirects(response, reverse('shop:order_success', args=[order.id]), fetch_redirect_response=False)
+        self.kettle.refresh_from_db()
+        self.toaster.refresh_from_db()
+        self.assertEqual(self.kettle.stock, 3)
+        self.assertEqual(self.toaster.stock, 0)
+        order.refresh_from_db()
+        self.assertTrue(order.paid)
+        self.assertTrue(order.stock_adjusted)
+
+    def test_repeated_callback_does_not_decrement_again(self):
+        order = self.make_order([(self.kettle, 2)])
+
+        self.pay(order)
+        self.pay(order)
+
+        self.kettle.refresh_from_db()
+        self.assertEqual(self.kettle.stock, 3)
+
+    def test_lines_for_the_same_product_are_summed(self):
+        order = self.make_order([(self.kettle, 1), (self.kettle, 2)])
+
+        self.pay(order)
+
+        self.kettle.refresh_from_db()
+        self.assertEqual(self.kettle.stock, 2)
+
+    def test_order_already_adjusted_at_checkout_is_left_alone(self):
+        order = self.make_order([(self.kettle, 2)], stock_adjusted=True)
+
+        self.pay(order)
+
+        self.kettle.refresh_from_db()
+        self.assertEqual(self.kettle.stock, 5)
+
+
+class CheckoutTests(ShopTestCase):
+    checkout_data = {
+        'first_name': 'Sam', 'last_name': 'Shopper', 'email': 'shopper@example.com',
+        'address': '1 Road', 'postal_code': '1000', 'city': 'Dhaka',
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.kettle = self.make_product('Kettle', stock=5)
+        self.toaster = self.make_product('Toaster', stock=2, price=Decimal('25.00'))
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, product=self.kettle, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.toaster, quantity=1)
+
+    def test_places_order_takes_stock_and_clears_cart(self):
+        response = self.client.post(reverse('shop:checkout'), self.checkout_data)
+
+        self.assertRedirects(response, reverse('shop:payment_process'), fetch_redirect_response=False)
+        order = Order.objects.get()
+        self.assertTrue(order.stock_adjusted)
+        self.assertEqual(
+            sorted(order.items.values_list('product__name', 'quantity', 'price')),
+            [('Kettle', 2, Decimal('10.00')), ('Toaster', 1, Decimal('25.00'))],
+        )
+        self.kettle.refresh_from_db()
+        self.toaster.refresh_from_db()
+        self.assertEqual((self.kettle.stock, self.toaster.stock), (3, 1))
+        self.assertFalse(self.cart.items.exists())
+
+    def test_rejects_quantities_above_stock(self):
+        Product.objects.filter(pk=self.toaster.pk).update(stock=0)
+
+        response = self.client.post(reverse('shop:checkout'), self.checkout_data)
+
+        self.assertRedirects(response, reverse('shop:cart_detail'), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+        self.kettle.refresh_from_db()
+        self.assertEqual(self.kettle.stock, 5)
+        self.assertEqual(self.cart.items.count(), 2)
+
+    def test_viewing_the_page_changes_nothing(self):
+        response = self.client.get(reverse('shop:checkout'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.cart.items.count(), 2)
+
+
+class CartAddTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.kettle = self.make_product('Kettle', stock=5)
+
+    def add(self, quantity):
+        return self.client.post(reverse('shop:cart_add', args=[self.kettle.id]), {'quantity': quantity})
+
+    def quantity_in_cart(self):
+        return CartItem.objects.get(cart__user=self.user, product=self.kettle).quantity
+
+    def test_first_add_creates_the_line_and_later_adds_increment_it(self):
+        self.add(2)
+        self.add(3)
+
+        self.assertEqual(self.quantity_in_cart(), 5)
+
+    def test_increment_beyond_stock_is_refused(self):
+        self.add(4)
+        self.add(2)
+
+        self.assertEqual(self.quantity_in_cart(), 4)
+
+    def test_concurrent_first_add_falls_back_to_increment(self):
+        get_or_create = Cart.objects.get_or_create
+
+        def racing_get_or_create(**kwargs):
+            # Another request inserts the same line between our UPDATE and INSERT
+            cart, created = get_or_create(**kwargs)
+            CartItem.objects.create(cart=cart, product=self.kettle, quantity=1)
+            return cart, created
+
+        with mock.patch.object(Cart.objects, 'get_or_create', side_effect=racing_get_or_create):
+            self.add(2)
+
+        self.assertEqual(self.quantity_in_cart(), 3)
+
+
+class RatingStatsTests(ShopTestCase):
+    def setUp(self):
+        super().setUp()
+        self.kettle = self.make_product('Kettle')
+        self.other = User.objects.create_user('other', 'other@example.com', 'pw')
+
+    def stats(self):
+        self.kettle.refresh_from_db()
+        return self.kettle.avg_rating, self.kettle.review_count, self.kettle.rating_count
+
+    def review(self, user, rating):
+        return ProductReview.objects.create(product=self.kettle, user=user, title='t', content='c', rating=rating)
+
+    def test_reviews_drive_the_stats(self):
+        self.review(self.user, 4)
+        self.review(self.other, 1)
+
+        self.assertEqual(self.stats(), (2.5, 2, 2))
+
+    def test_legacy_ratings_are_the_fallback(self):
+        Rating.objects.create(product=self.kettle, user=self.user, rating=2)
+
+        self.assertEqual(self.stats(), (2.0, 0, 1))
+
+        review = self.review(self.other, 5)
+        self.assertEqual(self.stats(), (5.0, 1, 1))
+
+        review.delete()
+        self.assertEqual(self.stats(), (2.0, 0, 1))
+
+    def test_deleting_the_last_review_resets_the_stats(self):
+        self.review(self.user, 3).delete()
+
+        self.assertEqual(self.stats(), (0.0, 0, 0))
+
+
+class OrderTotalsTests(ShopTestCase):
+    def test_with_totals_matches_get_total_cost(self):
+        kettle = self.make_product('Kettle', price=Decimal('12.50'))
+        toaster = self.make_product('Toaster', price=Decimal('30.00'))
+        orders = [
+            self.make_order([(kettle, 2), (toaster, 1)]),
+            self.make_order([(toaster, 3)]),
+            self.make_order([]),
+        ]
+
+        annotated = Order.objects.with_totals().in_bulk([order.id for order in orders])
+
+        for order in orders:
+            with self.subTest(order=order.id):
+                plain = Order.objects.get(id=order.id)
+                self.assertEqual(annotated[order.id].get_total_cost(), plain.get_total_cost())
+                self.assertEqual(annotated[order.id].item_count, plain.items.count())
+        self.assertEqual(annotated[orders[0].id].get_total_cost(), Decimal('55.00'))
+
+
+class QueryCountTests(ShopTestCase):
+    """Guards against per-row queries creeping back into the busiest pages"""
+
+    def setUp(self):
+        super().setUp()
+        garden = Category.objects.create(name='Garden', slug='garden')
+        self.products = [
+            self.make_product(f'Kettle{i}', carbon_footprint_kg=Decimal(i + 1)) for i in range(4)
+        ] + [
+            Product.objects.create(name=f'Hose{i}', slug=f'hose{i}', category=garden, price=Decimal('5.00'), stock=3)
+            for i in range(3)
+        ]
+        for product in self.products[::2]:
+            Rating.objects.create(product=product, user=self.user, rating=4)
+
+    def test_product_list(self):
+        url = reverse('shop:product_list')
+        self.client.get(url)  # warm the category and price range caches
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['products']), len(self.products))
+
+    def test_cart_detail(self):
+        self.client.force_login(self.user)
+        cart = Cart.objects.create(user=self.user)
+        for product in self.products[1::2]:
+            CartItem.objects.create(cart=cart, product=product, quantity=2)
 
-# Create your tests here.
+        with self.assertNumQueries(13):
+            response = self.client.get(reverse('shop:cart_detail'))
+        self.assertEqual(len(response.context['items_with_alt']), 3)
@@ -64,4 +64,5 @@ urlpatterns = [
     # Enhanced search URLs
     path('search/', views.product_search, name='product_search'),
     path('product-enhanced/<slug:slug>/', views.enhanced_product_detail, name='enhanced_product_detail'),
+    path('product/<int:product_id>/user-state/', views.product_user_state, name='product_user_state'),
 ]
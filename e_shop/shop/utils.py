@@ -1,5 +1,5 @@
 import json
-from urllib import response
+import logging
 import requests
 from django.conf import settings
 from django.template.loader import render_to_string
@@ -7,8 +7,8 @@ from django.core.mail import EmailMultiAlternatives
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
-from django.contrib.auth.models import User
-import secrets
+
+logger = logging.getLogger(__name__)
 
 
 # this function generates the SSLCommerz payment URL
@@ -43,34 +43,23 @@ def generate_sslcommerz_payment(order, request):
 # Send order confirmation email with HTML content
 def send_order_confirmation_email(order):
     """Send order confirmation email to customer"""
-    print(f"🔔 Starting email send for order #{order.id}")
-    print(f"📧 Recipient: {order.email}")
-    print(f"📧 From: {settings.DEFAULT_FROM_EMAIL}")
-    
     try:
         subject = f"Order Confirmation - Order #{order.id}"
         message = render_to_string('shop/order_confirmation_email.html', {'order': order})
         to = order.email
         from_email = settings.DEFAULT_FROM_EMAIL
-        
-        print(f"📧 Subject: {subject}")
-        print(f"📧 Email backend: {settings.EMAIL_BACKEND}")
-        
+        logger.debug(
+            "order.confirmation_sending order_id=%s to=%s from=%s backend=%s",
+            order.id, to, from_email, settings.EMAIL_BACKEND,
+        )
+
         send_email = EmailMultiAlternatives(subject, '', from_email, [to])
         send_email.attach_alternative(message, "text/html")
-        
-        print("📧 Attempting to send email...")
         send_email.send()
-        
-        print(f"✅ Order confirmation email sent to {to} for order #{order.id}")
-        print(f"📧 Email content preview: Order #{order.id}, Total: ${order.get_total_cost()}")
         return True
-    except Exception as e:
-        print(f"❌ Failed to send email for order #{order.id}: {str(e)}")
-        print(f"📧 Email would have been sent to: {order.email}")
-        print(f"💡 Check your email settings and Gmail App Password if using SMTP backend")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        # Usually the email settings (e.g. the Gmail App Password for the SMTP backend)
+        logger.exception("order.confirmation_error order_id=%s to=%s", order.id, order.email)
         return False
 
 
@@ -99,10 +88,8 @@ def send_password_reset_email(user, request):
         send_email.attach_alternative(message, "text/html")
         send_email.send()
         
-        print(f"✅ Password reset email sent to {to}")
+        logger.debug("password_reset.email_sent user_id=%s", user.pk)
         return True
-    except Exception as e:
-        print(f"❌ Failed to send password reset email: {str(e)}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("password_reset.email_failed user_id=%s", user.pk)
         return False
\ No newline at end of file
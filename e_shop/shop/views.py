@@ -1,35 +1,53 @@
-from unicodedata import category
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
-from .models import Category, Product, Rating, Cart, CartItem, Order, OrderItem, Wishlist, StockAlert, UserNotification, ProductReview, UserImpact, Badge, UserBadge, EnvironmentalImpact
-from .services.alternatives import greener_alternative, swap_ladder
+from .models import Category, Product, Rating, Cart, CartItem, Order, OrderItem, Wishlist, StockAlert, UserNotification, ProductReview, UserBadge
+from .services.alternatives import greener_alternative, greener_alternative_id, swap_ladder
+from .services.catalog import (
+    all_categories,
+    invalidate_categories,
+    search_products,
+    fuzzy_search_products,
+    FEATURED_PRODUCTS_CACHE_KEY,
+    FEATURED_PRODUCTS_CACHE_TIMEOUT,
+)
 from django.contrib import messages
-from .forms import UserRegistrationForm, UserLoginForm, RatingForm, CheckoutForm, ProductReviewForm, StockAlertForm, AdvancedSearchForm, PasswordResetRequestForm, SetNewPasswordForm
-from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Min, Max, Avg, Count
+from .forms import UserRegistrationForm, RatingForm, CheckoutForm, ProductReviewForm, StockAlertForm, AdvancedSearchForm, PasswordResetRequestForm, SetNewPasswordForm
 from django.contrib.auth.decorators import login_required
-from .utils import generate_sslcommerz_payment, send_order_confirmation_email, send_password_reset_email
+from django.db import transaction, IntegrityError
+from django.db.models import Q, F, Sum, Min, Max, Count, Value, Prefetch, DecimalField, OuterRef, Subquery, Exists, Case, When, IntegerField, prefetch_related_objects
+from django.db.models.functions import Greatest
+from .utils import generate_sslcommerz_payment, send_password_reset_email
 from decimal import Decimal
 from .services.budget import budget_status, update_budget
 from .services.simulator import project_scenario
 from .forms import CarbonBudgetForm
 from django.views.decorators.csrf import csrf_exempt
-from .services.impact import record_order_impact
+from .tasks import run_after_commit, record_order_impact_task, send_confirmation_task
 from .services.carbon_intelligence import (
     analyze_product_carbon_impact, 
-    generate_impact_story, 
+    cached_impact_story,
     check_carbon_achievements,
     simulate_future_impact,
-    get_environmental_equivalents
 )
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 from django.core.paginator import Paginator
-from django.utils import timezone
+from django.core.cache import cache
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_decode
 from django.utils.encoding import force_str
 from django.contrib.auth.models import User
+import logging
 
+logger = logging.getLogger(__name__)
+
+
+# Columns rendered by the product card templates (incl. effective_carbon_kg inputs)
+PRODUCT_CARD_FIELDS = (
+    'id', 'name', 'slug', 'price', 'image', 'stock', 'avg_rating',
+    'carbon_footprint_kg', 'category__default_emission_factor_kg',
+)
+# Product columns shown on the wishlist and stock alert rows
+WISHLIST_PRODUCT_FIELDS = ('id', 'name', 'slug', 'price', 'image', 'stock', 'description', 'avg_rating')
 
 
 # Create your views from here ..... 
@@ -79,11 +97,25 @@ def logout_view(request):
 
 
 
+# Catalog pages are rendered per request rather than response-cached (cache_page/ETag):
+# base.html carries each visitor's CSRF token and flash messages, so a shared copy would
+# leak them. The catalog data the pages read is cached instead
+
+
 # Home view
 def home(request):
     # Product model uses 'created' field (not 'created_at')
-    featured_products = Product.objects.filter(available=True).order_by('-created')[:8]
-    categories = Category.objects.all()
+    featured_products = cache.get_or_set(
+        FEATURED_PRODUCTS_CACHE_KEY,
+        lambda: list(
+            Product.objects.filter(available=True)
+            .select_related('category')
+            .only(*PRODUCT_CARD_FIELDS)
+            .order_by('-created')[:8]
+        ),
+        FEATURED_PRODUCTS_CACHE_TIMEOUT,
+    )
+    categories = all_categories()
 
     return render(request, 'shop/home.html', {
         'featured_products': featured_products,
@@ -94,14 +126,26 @@ def home(request):
 # Product list view
 def product_list(request, category_slug=None):
     category = None
-    categories = Category.objects.all()
+    categories = all_categories()
     products = Product.objects.filter(available=True)
 
     if category_slug:
-        category = get_object_or_404(Category, slug=category_slug)
-        products = products.filter(category=category)
-
-    price_range = products.aggregate(min_price=Min('price'), max_price=Max('price'))
+        # Resolve the slug from the cached category list instead of querying Category
+        category = next((c for c in categories if c['slug'] == category_slug), None)
+        if category is None:
+            # The list is cached per process, so another worker may have added or renamed it since
+            category = get_object_or_404(Category.objects.values('id', 'name', 'slug'), slug=category_slug)
+            invalidate_categories()
+            categories = all_categories()
+        products = products.filter(category_id=category['id'])
+
+    # Price bounds ignore the user's filters, so they can be cached per category
+    price_range = cache.get_or_set(
+        f'price_range_{category_slug or "all"}',
+        lambda: products.aggregate(min_price=Min('price'), max_price=Max('price')),
+        60,
+    )
+    products = products.select_related('category').only(*PRODUCT_CARD_FIELDS)
     min_price = price_range['min_price']
     max_price = price_range['max_price']
 
@@ -119,22 +163,24 @@ def product_list(request, category_slug=None):
     if request.GET.get('rating'):
         try:
             min_rating = int(request.GET.get('rating'))
-            products = products.annotate(avg_rating=Avg('ratings__rating')).filter(avg_rating__gte=min_rating)
+            products = products.filter(avg_rating__gte=min_rating)
         except Exception:
             pass
 
     query = request.GET.get('search', '').strip()
     if query:
-        products = products.filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(category__name__icontains=query)
-        )
+        products = search_products(products, query)
+    if not products.ordered:
+        products = products.order_by('-created', 'id')
+
+    page_obj = Paginator(products, 24).get_page(request.GET.get('page'))
 
     return render(request, 'shop/product_list.html', {
         'category': category,
         'categories': categories,
-        'products': products,
+        'products': page_obj,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
         'min_price': min_price,
         'max_price': max_price,
         'search_query': query,
@@ -143,8 +189,13 @@ def product_list(request, category_slug=None):
 
 # Product detail view
 def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug, available = True)
-    related_products = Product.objects.filter(category = product.category).exclude(id=product.id)
+    product = get_object_or_404(Product.objects.select_related('category'), slug=slug, available = True)
+    # Only the columns the related-products card renders, capped for the carousel
+    related_products = (
+        Product.objects.filter(category_id=product.category_id, available=True)
+        .exclude(id=product.id)
+        .only('id', 'name', 'slug', 'price', 'image')[:8]
+    )
     user_rating = None
 
     if request.user.is_authenticated:
@@ -154,17 +205,38 @@ def product_detail(request, slug):
             pass
     rating_form = RatingForm(instance=user_rating)
 
-    # Impact additions
-    alternative = greener_alternative(product)
-    ladder = swap_ladder(product)
+    # Impact additions (cached; product.updated in the key invalidates on edit).
+    # On a miss, one category scan is shared by the alternative, the ladder and the carbon analysis.
+    # Unavailable siblings are included: the helpers skip them, but they count towards the category average
+    category_products = None
+
+    def candidates():
+        nonlocal category_products
+        if category_products is None:
+            category_products = list(
+                Product.objects.filter(category_id=product.category_id)
+                .exclude(id=product.id)
+                .with_effective_carbon()
+                .only('id', 'name', 'slug', 'price', 'image', 'available', 'carbon_footprint_kg')
+                .order_by('id')
+            )
+        return category_products
+
+    version = f'{product.id}:{product.updated.timestamp()}'
+    alternative = cache.get_or_set(
+        f'alt:{version}', lambda: greener_alternative(product, candidates=candidates()), 3600
+    )
+    ladder = cache.get_or_set(f'ladder:{version}', lambda: swap_ladder(product, candidates=candidates()), 3600)
     
     # Carbon intelligence analysis
-    carbon_analysis = analyze_product_carbon_impact(product)
+    carbon_analysis = cache.get_or_set(
+        f'carbon:{version}', lambda: analyze_product_carbon_impact(product, candidates=candidates()), 3600
+    )
     
     # Get user's environmental impact story if authenticated
     impact_story = None
     if request.user.is_authenticated:
-        impact_story = generate_impact_story(request.user)
+        impact_story = cached_impact_story(request.user)
 
     return render(request, 'shop/product_detail.html', {
         'product': product,
@@ -182,21 +254,34 @@ def product_detail(request, slug):
 # Cart detail view
 @login_required
 def cart_detail(request):
-   try:
-       cart = Cart.objects.get(user=request.user)
-   except Cart.DoesNotExist:
-       cart = Cart.objects.create(user=request.user)
+   cart, _ = Cart.objects.get_or_create(user=request.user)
    # Build items footprint + alternative suggestions
    items_with_alt = []
    total_footprint = 0
-   for item in cart.items.select_related('product', 'product__category'):
+   # Items land in the cart's prefetch cache so the template's cart.items.all/count and
+   # get_total_price reuse them; each item's alternative is picked in SQL, and the
+   # alternatives are loaded together with just the columns the suggestion renders
+   prefetch_related_objects(
+       [cart],
+       Prefetch('items', queryset=CartItem.objects.select_related('product__category').annotate(
+           alternative_id=greener_alternative_id('product_id', 'product__category_id'),
+       )),
+   )
+   alternative_ids = {item.alternative_id for item in cart.items.all() if item.alternative_id}
+   alternatives = (
+       Product.objects.with_effective_carbon()
+       .only('id', 'name', 'slug', 'carbon_footprint_kg')
+       .in_bulk(alternative_ids)
+   ) if alternative_ids else {}
+   for item in cart.items.all():
        p = item.product
-       line_footprint = p.effective_carbon_kg() * item.quantity if hasattr(p, 'effective_carbon_kg') else 0
+       eff = p.effective_carbon_kg()
+       line_footprint = eff * item.quantity
        total_footprint += line_footprint
-       alt = greener_alternative(p)
+       alt = alternatives.get(item.alternative_id)
        potential_save = 0
        if alt:
-           potential_save = max((p.effective_carbon_kg() - alt.effective_carbon_kg()) * item.quantity, 0)
+           potential_save = max((eff - alt.effective_carbon_kg()) * item.quantity, 0)
        items_with_alt.append({
            'item': item,
            'alt': alt,
@@ -220,18 +305,13 @@ def cart_add(request, product_id):
         messages.error(request, "Invalid request method.")
         return redirect('shop:home')
     
-    product = get_object_or_404(Product, id=product_id)
+    product = get_object_or_404(Product.objects.only('id', 'name', 'slug', 'stock'), id=product_id)
     
     # Check if product is in stock
     if not product.is_in_stock():
         messages.error(request, f"Sorry, {product.name} is currently out of stock.")
         return redirect('shop:product_detail', slug=product.slug)
     
-    try:
-        cart = Cart.objects.get(user=request.user)
-    except Cart.DoesNotExist:
-        cart = Cart.objects.create(user=request.user)
-
     quantity = int(request.POST.get('quantity', 1))
     
     # Validate quantity
@@ -240,19 +320,31 @@ def cart_add(request, product_id):
         return redirect('shop:product_detail', slug=product.slug)
     
     # Check if adding this quantity would exceed stock
-    try:
-        cart_item = CartItem.objects.get(cart=cart, product=product)
-        new_total = cart_item.quantity + quantity
-        if new_total > product.stock:
-            messages.error(request, f"Cannot add {quantity} items. Only {product.stock - cart_item.quantity} available.")
-            return redirect('shop:product_detail', slug=product.slug)
-        cart_item.quantity = new_total
-        cart_item.save()
-    except CartItem.DoesNotExist:
-        if quantity > product.stock:
-            messages.error(request, f"Cannot add {quantity} items. Only {product.stock} available.")
+    if quantity > product.stock:
+        messages.error(request, f"Cannot add {quantity} items. Only {product.stock} available.")
+        return redirect('shop:product_detail', slug=product.slug)
+
+    # Atomic increment; the stock guard lives in the WHERE clause so concurrent adds can't oversell
+    # Filtering through cart__user means the common "add again" path never loads the cart
+    updated = CartItem.objects.filter(
+        cart__user=request.user, product=product, quantity__lte=product.stock - quantity
+    ).update(quantity=F('quantity') + quantity)
+    if not updated:
+        in_cart = CartItem.objects.filter(cart__user=request.user, product=product).values_list('quantity', flat=True).first()
+        if in_cart is not None:
+            messages.error(request, f"Cannot add {quantity} items. Only {product.stock - in_cart} available.")
             return redirect('shop:product_detail', slug=product.slug)
-        CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+        cart, _ = Cart.objects.get_or_create(user=request.user)
+        try:
+            with transaction.atomic():
+                CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+        except IntegrityError:
+            # A concurrent add inserted the line first; fall back to the guarded increment
+            if not CartItem.objects.filter(
+                cart=cart, product=product, quantity__lte=product.stock - quantity
+            ).update(quantity=F('quantity') + quantity):
+                messages.error(request, f"Cannot add {quantity} items. Not enough stock left.")
+                return redirect('shop:product_detail', slug=product.slug)
 
     messages.success(request, f"{product.name} has been added to your cart.")
     return redirect('shop:product_detail', slug=product.slug)
@@ -265,9 +357,10 @@ def cart_remove(request, product_id):
         messages.error(request, "Invalid request method.")
         return redirect('shop:cart_detail')
     
-    cart = get_object_or_404(Cart, user=request.user)
-    product = get_object_or_404(Product, id=product_id)
-    cart_item = get_object_or_404(CartItem, cart=cart, product=product)
+    cart_item = get_object_or_404(
+        CartItem.objects.select_related('product'), cart__user=request.user, product_id=product_id
+    )
+    product = cart_item.product
     cart_item.delete()
     messages.success(request, f"{product.name} has been removed from your cart.")
     return redirect('shop:cart_detail')
@@ -277,18 +370,19 @@ def cart_remove(request, product_id):
 # Cart update view
 @login_required
 def cart_update(request, product_id):
-    cart = get_object_or_404(Cart, user=request.user)
-    product = get_object_or_404(Product, id=product_id)
-    cart_item = get_object_or_404(CartItem, cart=cart, product=product)
+    product = get_object_or_404(Product.objects.only('id', 'name'), id=product_id)
+    # Targeted DELETE/UPDATE on the line; the item row itself is never loaded
+    cart_item = CartItem.objects.filter(cart__user=request.user, product=product)
 
     quantity = int(request.POST.get('quantity', 1))
 
     if quantity <= 0:
-        cart_item.delete()
+        if not cart_item.delete()[0]:
+            raise Http404("No CartItem matches the given query.")
         messages.success(request, f"{product.name} has been removed from your cart!")
     else:
-        cart_item.quantity = quantity
-        cart_item.save()
+        if not cart_item.update(quantity=quantity):
+            raise Http404("No CartItem matches the given query.")
         messages.success(request, f"{product.name} has been updated in your cart.")
     return redirect('shop:cart_detail')
 
@@ -297,18 +391,21 @@ def cart_update(request, product_id):
 # Checkout view
 @login_required
 def checkout(request):
-    try:
-        cart = Cart.objects.get(user=request.user)
-        if not cart.items.exists():
-            messages.warning(request, 'Your cart is empty!')
-            return redirect('shop:cart_detail')
-    except Cart.DoesNotExist:
+    # One query serves both the empty-cart guard and the loops below; prefetched so the
+    # template's cart.items.all and get_total_price don't query per row
+    cart = (
+        Cart.objects.prefetch_related(Prefetch('items', queryset=CartItem.objects.select_related('product')))
+        .filter(user=request.user)
+        .first()
+    )
+    items = list(cart.items.all()) if cart else []
+    if not items:
         messages.warning(request, 'Your cart is empty!')
         return redirect('shop:cart_detail')
 
     # Validate cart items before checkout
     invalid_items = []
-    for item in cart.items.all():
+    for item in items:
         if not item.product.is_in_stock():
             invalid_items.append(f"{item.product.name} is out of stock")
         elif item.quantity > item.product.stock:
@@ -323,44 +420,59 @@ def checkout(request):
         form = CheckoutForm(request.POST)
         if form.is_valid():
             try:
-                # Double-check stock before creating order
-                for item in cart.items.all():
-                    if not item.product.is_in_stock() or item.quantity > item.product.stock:
-                        messages.error(request, f"Stock unavailable for {item.product.name}. Please update your cart.")
+                # Only placing the order takes locks; viewing the page never does
+                with transaction.atomic():
+                    # Locking the cart row serializes concurrent checkouts for the same user,
+                    # so the lines are re-read under the lock
+                    cart = Cart.objects.select_for_update().get(pk=cart.pk)
+                    items = list(cart.items.all())
+                    if not items:
+                        messages.warning(request, 'Your cart is empty!')
                         return redirect('shop:cart_detail')
-                
-                order = form.save(commit=False)
-                order.user = request.user
-                order.save()
-
-                # Create order items and update stock
-                for item in cart.items.all():
-                    OrderItem.objects.create(
-                        order=order, 
-                        product=item.product, 
-                        price=item.product.price, 
-                        quantity=item.quantity
-                    )
-                    # Update product stock
-                    item.product.stock -= item.quantity
-                    item.product.save()
-                
-                # Clear cart
-                cart.items.all().delete()
+
+                    # Lock the products and double-check stock before creating order, so
+                    # concurrent checkouts of the same product cannot both pass the check
+                    products = Product.objects.select_for_update().in_bulk([item.product_id for item in items])
+                    for item in items:
+                        item.product = products[item.product_id]
+                        if not item.product.is_in_stock() or item.quantity > item.product.stock:
+                            messages.error(request, f"Stock unavailable for {item.product.name}. Please update your cart.")
+                            return redirect('shop:cart_detail')
+
+                    order = form.save(commit=False)
+                    order.user = request.user
+                    order.stock_adjusted = True
+                    order.save()
+
+                    # Create order items in one INSERT and update stock in one UPDATE
+                    OrderItem.objects.bulk_create([
+                        OrderItem(
+                            order=order,
+                            product=item.product,
+                            price=item.product.price,
+                            quantity=item.quantity
+                        )
+                        for item in items
+                    ])
+                    for item in items:
+                        item.product.stock -= item.quantity
+                    Product.objects.bulk_update(products.values(), ['stock'])
+
+                    # Clear cart
+                    cart.items.all().delete()
                 request.session['order_id'] = order.id
                 messages.success(request, 'Your order has been placed successfully!')
                 return redirect('shop:payment_process')
-            except Exception as e:
+            except Exception:
+                logger.exception("order.checkout_failed user_id=%s", request.user.id)
                 messages.error(request, 'An error occurred while processing your order. Please try again.')
                 return redirect('shop:checkout')
     else:
-        initial_data = {}
-        if request.user.first_name:
-            initial_data['first_name'] = request.user.first_name
-        if request.user.last_name:
-            initial_data['last_name'] = request.user.last_name
-        if request.user.email:
-            initial_data['email'] = request.user.email
+        initial_data = {
+            field: value
+            for field in ('first_name', 'last_name', 'email')
+            if (value := getattr(request.user, field, None))
+        }
         form = CheckoutForm(initial=initial_data)
 
     return render(request, 'shop/checkout.html', {
@@ -393,49 +505,53 @@ def payment_process(request):
 # Payment success view
 @csrf_exempt
 def payment_success(request, order_id):
-    # Debug session and authentication
-    print(f"🔍 Payment success called for order #{order_id}")
-    print(f"🔍 User authenticated: {request.user.is_authenticated}")
-    print(f"🔍 User: {request.user}")
-    print(f"🔍 Session key: {request.session.session_key}")
-    
-    # Check if user is authenticated, if not try to get order without user filter
-    if not request.user.is_authenticated:
-        print("⚠️ User not authenticated in payment_success, trying to find order without user filter")
-        order = get_object_or_404(Order, id=order_id)
-        # If order exists but user not authenticated, it might be a session issue
-        # Let's continue processing but redirect differently
-    else:
-        order = get_object_or_404(Order, id=order_id, user=request.user)
-    
-    order.paid = True
-    # Align with defined choices ('Processing')
-    order.status = 'Processing'
-    order.transaction_id = order.id
-    order.save()
-
-    order_items = order.items.all()
-    for item in order_items:
-        product = item.product
-        product.stock -= item.quantity
-
-        if product.stock < 0:
-            product.stock = 0
-        product.save()
-
-    # Record sustainability impact after successful payment
-    try:
-        record_order_impact(order)
-    except Exception:
-        pass
-    
-    # Send order confirmation email
-    print(f"🔔 Attempting to send order confirmation email for order #{order.id}")
-    email_sent = send_order_confirmation_email(order)
-    if email_sent:
-        print(f"✅ Order confirmation email sent successfully to {order.email}")
-    else:
-        print(f"❌ Failed to send order confirmation email to {order.email}")
+    # Lock the order row so repeated gateway callbacks cannot adjust stock twice
+    orders = Order.objects.select_for_update()
+    with transaction.atomic():
+        # Check if user is authenticated, if not try to get order without user filter
+        if not request.user.is_authenticated:
+            order = get_object_or_404(orders, id=order_id)
+            # If order exists but user not authenticated, it might be a session issue
+            # Let's continue processing but redirect differently
+        else:
+            order = get_object_or_404(orders, id=order_id, user=request.user)
+
+        order.paid = True
+        # Align with defined choices ('Processing')
+        order.status = 'Processing'
+        order.transaction_id = order.id
+
+        # Stock is normally taken at checkout; only decrement for orders that skipped it.
+        # Done in a single SQL UPDATE, clamped at zero, without loading each product
+        if not order.stock_adjusted:
+            quantities = {}
+            for product_id, quantity in order.items.values_list('product_id', 'quantity'):
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            if quantities:
+                Product.objects.filter(id__in=quantities).update(stock=Case(
+                    *[
+                        When(id=product_id, then=Greatest(F('stock') - quantity, Value(0)))
+                        for product_id, quantity in quantities.items()
+                    ],
+                    default=F('stock'),
+                    output_field=IntegerField(),
+                ))
+            order.stock_adjusted = True
+        order.save()
+
+    # Record sustainability impact and send the confirmation email once the order is committed;
+    # a failure in either is logged and doesn't fail the payment redirect
+    run_after_commit(record_order_impact_task, order.id)
+    run_after_commit(send_confirmation_task, order.id)
+    logger.info(
+        "order.paid order_id=%s user_id=%s authenticated=%s",
+        order.id, order.user_id, request.user.is_authenticated,
+        extra={
+            'order_id': order.id,
+            'user_id': order.user_id,
+            'authenticated': request.user.is_authenticated,
+        },
+    )
     
     messages.success(request, 'Payment successful! Your order has been placed.')
     
@@ -447,8 +563,7 @@ def payment_success(request, order_id):
 # Order success page view
 def order_success(request, order_id):
     """Order success page that works for both authenticated and anonymous users"""
-    print(f"🔍 Order success page called for order #{order_id}")
-    print(f"🔍 User authenticated: {request.user.is_authenticated}")
+    logger.debug("Order success page called for order #%s (authenticated=%s)", order_id, request.user.is_authenticated)
     
     # Try to get order, don't require authentication
     try:
@@ -474,9 +589,6 @@ def order_success(request, order_id):
 # Payment fail view
 @csrf_exempt
 def payment_fail(request, order_id):
-    print(f"🔍 Payment fail called for order #{order_id}")
-    print(f"🔍 User authenticated: {request.user.is_authenticated}")
-    
     if request.user.is_authenticated:
         order = get_object_or_404(Order, id=order_id, user=request.user)
     else:
@@ -484,6 +596,10 @@ def payment_fail(request, order_id):
         
     order.status = 'Cancelled'
     order.save()
+    logger.info(
+        "order.payment_failed order_id=%s user_id=%s", order.id, order.user_id,
+        extra={'order_id': order.id, 'user_id': order.user_id},
+    )
     messages.error(request, 'Payment failed. Please try again.')
     
     if request.user.is_authenticated:
@@ -496,9 +612,6 @@ def payment_fail(request, order_id):
 # Payment cancel view
 @csrf_exempt
 def payment_cancel(request, order_id):
-    print(f"🔍 Payment cancel called for order #{order_id}")
-    print(f"🔍 User authenticated: {request.user.is_authenticated}")
-    
     if request.user.is_authenticated:
         order = get_object_or_404(Order, id=order_id, user=request.user)
     else:
@@ -506,6 +619,10 @@ def payment_cancel(request, order_id):
         
     order.status = 'Cancelled'
     order.save()
+    logger.info(
+        "order.payment_cancelled order_id=%s user_id=%s", order.id, order.user_id,
+        extra={'order_id': order.id, 'user_id': order.user_id},
+    )
     messages.info(request, 'Payment was cancelled.')
     
     if request.user.is_authenticated:
@@ -518,10 +635,25 @@ def payment_cancel(request, order_id):
 @login_required
 def profile(request):
     tab = request.GET.get('tab')
-    orders = Order.objects.filter(user=request.user).order_by('-created')
-    completed_orders = orders.filter(status='Delivered').count()
-    total_spent = sum(order.get_total_cost() for order in orders if order.paid)  # Fixed: added ()
+    orders = (
+        Order.objects.filter(user=request.user)
+        .only('id', 'status', 'paid', 'created')
+        .with_totals()
+        .order_by('-created')
+    )
+    # Totals are reduced in the database instead of walking every order/item in Python
+    totals = Order.objects.filter(user=request.user).aggregate(
+        completed=Count('id', filter=Q(status='Delivered'), distinct=True),
+        spent=Sum(
+            F('items__price') * F('items__quantity'),
+            filter=Q(paid=True),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+    completed_orders = totals['completed']
+    total_spent = totals['spent'] or 0
     order_history_active = (tab == 'orders')
+    orders = Paginator(orders, 10).get_page(request.GET.get('page'))
     return render(request, 'shop/profile.html', {
         'user' : request.user,
         'orders' : orders,
@@ -539,22 +671,30 @@ def impact_dashboard(request):
     recent_impacts = []
     if ui:
         # Get recent orders with impact data
-        recent_orders = request.user.orders.filter(impact__isnull=False).select_related('impact').order_by('-created')[:5]
-        recent_impacts = [
-            {
-                'id': order.id,
-                'carbon': order.impact.carbon_kg,
-                'saved': order.impact.saved_kg,
-                'created': order.impact.created_at,
-            }
-            for order in recent_orders
-        ]
+        # Plain dicts straight from SQL; no Order/OrderImpact instances are built.
+        # 'created_at' rather than 'created', which would clash with Order.created
+        recent_impacts = list(
+            request.user.orders.filter(impact__isnull=False)
+            .order_by('-created')
+            .values(
+                'id',
+                carbon=F('impact__carbon_kg'),
+                saved=F('impact__saved_kg'),
+                created_at=F('impact__created_at'),
+            )[:5]
+        )
     
     # Generate personalized impact story
-    impact_story = generate_impact_story(request.user)
+    impact_story = cached_impact_story(request.user)
     
     # Get user's badges
-    user_badges = UserBadge.objects.filter(user=request.user).select_related('badge').order_by('-earned_at')
+    # Dashboard shows the latest badges only, with the three columns it renders
+    user_badges = list(
+        UserBadge.objects.filter(user=request.user)
+        .select_related('badge')
+        .only('id', 'earned_at', 'badge__id', 'badge__name', 'badge__icon')
+        .order_by('-earned_at')[:10]
+    )
     
     form = CarbonBudgetForm(initial={'month_budget_kg': ui.month_budget_kg if ui else 0})
     return render(request, 'shop/impact_dashboard.html', {
@@ -590,7 +730,6 @@ def what_if_simulator(request):
         except Exception:
             messages.error(request, 'Invalid input for simulation.')
             return redirect('shop:impact_dashboard')
-        from decimal import Decimal as D
         result = project_scenario(request.user, swap_fraction, saving_ratio, months)
         request.session['simulator_result'] = {k: str(v) for k,v in result.items()}
         return redirect('shop:impact_dashboard')
@@ -612,7 +751,7 @@ def environmental_simulator(request):
                 'success': True,
                 'simulation': simulation
             })
-        except (ValueError, TypeError) as e:
+        except (ValueError, TypeError):
             return JsonResponse({
                 'success': False,
                 'error': 'Invalid input parameters'
@@ -625,21 +764,21 @@ def environmental_simulator(request):
 # Rate product view
 @login_required
 def rate_product(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
-    ordered_items = OrderItem.objects.filter(
-        order__user=request.user,
-        order__paid=True,
-        product=product
+    # Purchase check and existing rating id come back with the product in one query
+    product = get_object_or_404(
+        Product.objects.with_purchased_by(request.user).annotate(
+            user_rating_id=Subquery(
+                Rating.objects.filter(product=OuterRef('pk'), user=request.user).values('id')[:1]
+            )
+        ),
+        id=product_id,
     )
 
-    if not ordered_items.exists():
+    if not product.user_has_purchased:
         messages.warning(request, 'You can only rate products you have purchased')
         return redirect('shop:product_detail', slug=product.slug)
 
-    try:
-        rating = Rating.objects.get(product=product, user=request.user)
-    except Rating.DoesNotExist:
-        rating = None
+    rating = Rating.objects.get(pk=product.user_rating_id) if product.user_rating_id else None
 
     if request.method == 'POST':
         form = RatingForm(request.POST, instance=rating)
@@ -666,7 +805,11 @@ def rate_product(request, product_id):
 @login_required
 def wishlist(request):
     """Display user's wishlist"""
-    wishlist_items = Wishlist.objects.filter(user=request.user).select_related('product')
+    wishlist_items = (
+        Wishlist.objects.filter(user=request.user)
+        .select_related('product')
+        .only('id', 'added_at', *(f'product__{f}' for f in WISHLIST_PRODUCT_FIELDS))
+    )
     
     return render(request, 'shop/wishlist.html', {
         'wishlist_items': wishlist_items
@@ -710,51 +853,11 @@ def wishlist_remove(request, product_id):
 @login_required
 def order_detail(request, order_id):
     """Detailed order tracking page"""
-    order = get_object_or_404(Order, id=order_id, user=request.user)
-    
-    # Order status timeline
-    status_timeline = []
-    if order.created:
-        status_timeline.append({
-            'status': 'Order Placed',
-            'date': order.created,
-            'completed': True
-        })
-    
-    if order.paid:
-        status_timeline.append({
-            'status': 'Payment Confirmed',
-            'date': order.updated,  # Approximate
-            'completed': True
-        })
-    
-    if order.status in ['Processing', 'Shipped', 'Out for Delivery', 'Delivered']:
-        status_timeline.append({
-            'status': 'Processing',
-            'date': order.updated,
-            'completed': True
-        })
-    
-    if order.shipped_at:
-        status_timeline.append({
-            'status': 'Shipped',
-            'date': order.shipped_at,
-            'completed': True
-        })
-    
-    if order.status == 'Out for Delivery':
-        status_timeline.append({
-            'status': 'Out for Delivery',
-            'date': order.updated,
-            'completed': True
-        })
-    
-    if order.delivered_at:
-        status_timeline.append({
-            'status': 'Delivered',
-            'date': order.delivered_at,
-            'completed': True
-        })
+    # Items, their products and categories arrive in three batched queries for the item list
+    order = get_object_or_404(
+        Order.objects.prefetch_related('items__product__category'), id=order_id, user=request.user
+    )
+    status_timeline = order.get_status_timeline()
     
     return render(request, 'shop/order_detail.html', {
         'order': order,
@@ -766,24 +869,23 @@ def order_detail(request, order_id):
 @login_required
 def product_review(request, product_id):
     """Add or edit product review"""
-    product = get_object_or_404(Product, id=product_id)
-    
-    # Check if user has purchased this product
-    has_purchased = OrderItem.objects.filter(
-        order__user=request.user,
-        order__paid=True,
-        product=product
-    ).exists()
+    # Purchase check and existing review id come back with the product in one query
+    product = get_object_or_404(
+        Product.objects.with_purchased_by(request.user).annotate(
+            user_review_id=Subquery(
+                ProductReview.objects.filter(product=OuterRef('pk'), user=request.user).values('id')[:1]
+            )
+        ),
+        id=product_id,
+    )
+    has_purchased = product.user_has_purchased
     
     if not has_purchased:
         messages.warning(request, 'You can only review products you have purchased.')
         return redirect('shop:product_detail', slug=product.slug)
     
     # Get existing review if any
-    try:
-        review = ProductReview.objects.get(product=product, user=request.user)
-    except ProductReview.DoesNotExist:
-        review = None
+    review = ProductReview.objects.get(pk=product.user_review_id) if product.user_review_id else None
     
     if request.method == 'POST':
         form = ProductReviewForm(request.POST, instance=review)
@@ -809,10 +911,11 @@ def product_review(request, product_id):
 def review_helpful(request, review_id):
     """Mark review as helpful"""
     if request.method == 'POST':
-        review = get_object_or_404(ProductReview, id=review_id)
-        review.helpful_votes += 1
-        review.save()
-        return JsonResponse({'status': 'success', 'helpful_votes': review.helpful_votes})
+        # Increment in SQL so concurrent clicks can't overwrite each other
+        if not ProductReview.objects.filter(id=review_id).update(helpful_votes=F('helpful_votes') + 1):
+            raise Http404("No ProductReview matches the given query.")
+        helpful_votes = ProductReview.objects.filter(id=review_id).values_list('helpful_votes', flat=True).first()
+        return JsonResponse({'status': 'success', 'helpful_votes': helpful_votes})
     
     return JsonResponse({'status': 'error'})
 
@@ -848,7 +951,11 @@ def stock_alert_create(request, product_id):
 @login_required
 def stock_alerts_list(request):
     """List all user's stock alerts"""
-    alerts = StockAlert.objects.filter(user=request.user, is_active=True).select_related('product')
+    alerts = (
+        StockAlert.objects.filter(user=request.user, is_active=True)
+        .select_related('product')
+        .only('id', 'threshold', 'created_at', *(f'product__{f}' for f in WISHLIST_PRODUCT_FIELDS))
+    )
     
     return render(request, 'shop/stock_alerts.html', {
         'alerts': alerts
@@ -872,10 +979,9 @@ def stock_alert_remove(request, alert_id):
 def notifications(request):
     """User notifications page"""
     notifications = UserNotification.objects.filter(user=request.user)
-    unread_count = notifications.filter(is_read=False).count()
     
-    # Mark all as read when viewing
-    notifications.filter(is_read=False).update(is_read=True)
+    # Mark all as read when viewing; the UPDATE's row count doubles as the unread count
+    unread_count = notifications.filter(is_read=False).update(is_read=True)
     
     paginator = Paginator(notifications, 20)
     page_number = request.GET.get('page')
@@ -898,8 +1004,9 @@ def notifications_count(request):
 def product_search(request):
     """Advanced product search with filters"""
     form = AdvancedSearchForm(request.GET)
-    products = Product.objects.filter(available=True)
-    categories = Category.objects.all()
+    # avg_rating/rating_count are stored columns, so filtering, sorting and counting need no GROUP BY
+    products = Product.objects.filter(available=True).select_related('category')
+    categories = all_categories()
     
     if form.is_valid():
         query = form.cleaned_data.get('query')
@@ -911,11 +1018,7 @@ def product_search(request):
         
         # Apply filters
         if query:
-            products = products.filter(
-                Q(name__icontains=query) |
-                Q(description__icontains=query) |
-                Q(category__name__icontains=query)
-            )
+            products = fuzzy_search_products(products, query)
         
         if min_price:
             products = products.filter(price__gte=min_price)
@@ -924,25 +1027,16 @@ def product_search(request):
             products = products.filter(price__lte=max_price)
         
         if min_rating:
-            products = products.annotate(
-                avg_rating=Avg('reviews__rating')
-            ).filter(avg_rating__gte=int(min_rating))
+            products = products.filter(avg_rating__gte=int(min_rating))
         
         if in_stock_only:
             products = products.filter(stock__gt=0)
         
         # Apply sorting
         if sort_by:
-            if sort_by == '-avg_rating':
-                products = products.annotate(avg_rating=Avg('reviews__rating')).order_by('-avg_rating')
-            else:
-                products = products.order_by(sort_by)
-    
-    # Annotate with ratings for display
-    products = products.annotate(
-        avg_rating=Avg('reviews__rating'),
-        review_count=Count('reviews')
-    )
+            products = products.order_by(sort_by, 'id')
+    if not products.ordered:
+        products = products.order_by('-created', 'id')
     
     # Pagination
     paginator = Paginator(products, 12)
@@ -953,77 +1047,81 @@ def product_search(request):
         'form': form,
         'products': page_obj,
         'categories': categories,
-        'total_results': products.count()
+        # Reuse the paginator's COUNT instead of issuing a second one
+        'total_results': paginator.count
     })
 
 
 # Enhanced Product Detail with Reviews
 def enhanced_product_detail(request, slug):
-    """Enhanced product detail page with reviews and recommendations"""
-    product = get_object_or_404(Product, slug=slug, available=True)
+    """Enhanced product detail page with reviews and recommendations.
+    Per-user state (own review, purchase, wishlist) is loaded from product_user_state"""
+    product = get_object_or_404(Product.objects.select_related('category'), slug=slug, available=True)
     
     # Get product reviews
     reviews = ProductReview.objects.filter(product=product).select_related('user').order_by('-created_at')
-    review_stats = reviews.aggregate(
-        avg_rating=Avg('rating'),
-        total_reviews=Count('id')
-    )
-    
-    # Rating distribution
-    rating_distribution = {}
-    for i in range(1, 6):
-        rating_distribution[i] = reviews.filter(rating=i).count()
-    
-    # User's existing review
-    user_review = None
-    user_has_purchased = False
-    if request.user.is_authenticated:
-        try:
-            user_review = ProductReview.objects.get(product=product, user=request.user)
-        except ProductReview.DoesNotExist:
-            pass
-        
-        user_has_purchased = OrderItem.objects.filter(
-            order__user=request.user,
-            order__paid=True,
-            product=product
-        ).exists()
+    # Rating distribution; one GROUP BY rating also yields the totals for review_stats
+    rating_counts = dict(reviews.order_by().values_list('rating').annotate(count=Count('id')))
+    rating_distribution = {i: rating_counts.get(i, 0) for i in range(1, 6)}
+    total_reviews = sum(rating_counts.values())
+    review_stats = {
+        'avg_rating': (
+            sum(rating * count for rating, count in rating_counts.items()) / total_reviews
+            if total_reviews else None
+        ),
+        'total_reviews': total_reviews,
+    }
     
     # Related products based on category and ratings
     related_products = Product.objects.filter(
         category=product.category,
         available=True
-    ).exclude(id=product.id).annotate(
-        avg_rating=Avg('reviews__rating')
-    ).order_by('-avg_rating')[:4]
-    
-    # Check if in wishlist
-    in_wishlist = False
-    if request.user.is_authenticated:
-        in_wishlist = Wishlist.objects.filter(user=request.user, product=product).exists()
+    ).exclude(id=product.id).order_by('-avg_rating')[:4]
     
     # Stock alert form
     stock_alert_form = StockAlertForm()
     
-    # Impact additions
-    alternative = greener_alternative(product)
-    ladder = swap_ladder(product)
+    # Impact additions, shared with product_detail's cache entries
+    version = f'{product.id}:{product.updated.timestamp()}'
+    alternative = cache.get_or_set(f'alt:{version}', lambda: greener_alternative(product), 3600)
+    ladder = cache.get_or_set(f'ladder:{version}', lambda: swap_ladder(product), 3600)
     
     return render(request, 'shop/enhanced_product_detail.html', {
         'product': product,
         'reviews': reviews[:5],  # Show first 5 reviews
         'review_stats': review_stats,
         'rating_distribution': rating_distribution,
-        'user_review': user_review,
-        'user_has_purchased': user_has_purchased,
         'related_products': related_products,
-        'in_wishlist': in_wishlist,
         'stock_alert_form': stock_alert_form,
         'alternative': alternative,
         'ladder': ladder,
     })
 
 
+def product_user_state(request, product_id):
+    """Current user's review/purchase/wishlist state for a product (AJAX), in one query"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'user_review': None, 'user_has_purchased': False, 'in_wishlist': False})
+
+    user_reviews = ProductReview.objects.filter(user=request.user, product=OuterRef('pk'))
+    state = get_object_or_404(
+        Product.objects.with_purchased_by(request.user).annotate(
+            in_wishlist=Exists(Wishlist.objects.filter(user=request.user, product=OuterRef('pk'))),
+            user_review_id=Subquery(user_reviews.values('id')[:1]),
+            user_review_rating=Subquery(user_reviews.values('rating')[:1]),
+        ).values('user_has_purchased', 'in_wishlist', 'user_review_id', 'user_review_rating'),
+        id=product_id, available=True,
+    )
+    user_review = None
+    if state['user_review_id']:
+        user_review = {'id': state['user_review_id'], 'rating': state['user_review_rating']}
+    return JsonResponse({
+        'user_review': user_review,
+        'user_has_purchased': state['user_has_purchased'],
+        'in_wishlist': state['in_wishlist'],
+    })
+
+
 # =================== Password Reset Views =================== #
 
 def password_reset_request(request):
@@ -1047,9 +1145,9 @@ def password_reset_request(request):
                 else:
                     # This shouldn't happen due to form validation, but just in case
                     messages.error(request, 'No account found with this email address.')
-            except Exception as e:
+            except Exception:
                 messages.error(request, 'An error occurred while processing your request. Please try again.')
-                print(f"Password reset error: {e}")
+                logger.exception("Password reset error")
         else:
             messages.error(request, 'Please enter a valid email address.')
     else: